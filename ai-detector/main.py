@@ -5,7 +5,10 @@ import time
 import logging
 import os
 import shutil
+import zlib
+import subprocess
 import numpy as np
+from numba import njit
 
 # --- CPU LIMITS ---
 os.environ["OMP_NUM_THREADS"] = "1"
@@ -23,24 +26,42 @@ MODEL_NAME = "yolov8n_openvino_model"
 PT_NAME = "yolov8n.pt"
 
 # --- TUNING ---
-FRAME_SKIP = 15       
+ANALYSIS_FPS = 2      # ffmpeg drops everything else before it reaches the pipe
 CONFIDENCE = 0.60     
 IMGSZ = 320           
 
 # OBJECT MOTION: How many pixels INSIDE the box must move to be "Real"
 OBJECT_MOTION_THRESHOLD = 50 
 
+# PIXEL MOTION: Per-pixel brightness change (0-255) that counts as "moved"
+MOTION_PIXEL_THRESHOLD = 25
+
 # GLOBAL MOTION: How many pixels must move on SCREEN to wake up the AI
 # 1000 is roughly a small cat moving. Prevents AI from running on empty frames.
 GLOBAL_MOTION_THRESHOLD = 1000 
 
-os.environ["OPENCV_FFMPEG_CAPTURE_OPTIONS"] = "rtsp_transport;tcp"
+# motion_roi selects cells of a ROI_GRID x ROI_GRID grid laid over the frame
+ROI_GRID = 10
+
+# Frames are fingerprinted at this size; an identical fingerprint means nothing changed
+FINGERPRINT_SIZE = (64, 36)
+
+# ffmpeg scales to the model input size itself, so only IMGSZ x IMGSZ BGR
+# frames cross the pipe instead of full-resolution decodes
+FRAME_BYTES = IMGSZ * IMGSZ * 3
 
 logging.basicConfig(level=logging.INFO, format="[AI] %(message)s")
 log = logging.getLogger("ai-detector")
 
 watchers = {}
 
+# One model is shared by every camera thread; inference is serialized through this lock
+inference_lock = threading.Lock()
+
+# Row-major ROI cell id of every pixel in an IMGSZ x IMGSZ frame, built once
+_cell_index = np.arange(IMGSZ) * ROI_GRID // IMGSZ
+ROI_CELL_IDS = (_cell_index[:, None] * ROI_GRID + _cell_index[None, :]).astype(np.uint8)
+
 def get_cameras():
     try:
         resp = requests.get(f"{API_URL}/internal/cameras", timeout=2)
@@ -50,7 +71,61 @@ def get_cameras():
         pass 
     return []
 
-def process_camera(camera, stop_event):
+def build_roi_map(roi_string):
+    """Per-pixel 0/1 map of the cells selected in motion_roi; the whole frame when none are."""
+    selected = np.zeros(ROI_GRID * ROI_GRID, dtype=np.uint8)
+    if roi_string:
+        try:
+            cells = [int(i) for i in roi_string.split(',') if i.strip()]
+        except ValueError:
+            cells = []
+        for cell_id in cells:
+            if 0 <= cell_id < ROI_GRID * ROI_GRID:
+                selected[cell_id] = 1
+    if not selected.any():
+        selected[:] = 1
+    return selected[ROI_CELL_IDS]
+
+# absdiff + threshold + ROI gate + count in one pass over the frame, writing the
+# binary mask into a reused buffer. nogil lets camera threads run it concurrently.
+# Compiled eagerly for C-contiguous uint8 frames, with the frame size and
+# threshold read from module constants, which Numba freezes into the machine
+# code: fixed trip counts and an immediate compare let LLVM vectorise the loop.
+@njit("int64(uint8[:, ::1], uint8[:, ::1], uint8[:, ::1], uint8[:, ::1])", cache=True, nogil=True)
+def motion_step(prev_gray, gray, roi_map, mask):
+    count = 0
+    for i in range(IMGSZ):
+        for j in range(IMGSZ):
+            # Widen to signed first: Numba keeps int() of a uint8 unsigned, so the difference would wrap
+            if roi_map[i, j] and abs(np.int32(gray[i, j]) - np.int32(prev_gray[i, j])) > MOTION_PIXEL_THRESHOLD:
+                mask[i, j] = 255
+                count += 1
+            else:
+                mask[i, j] = 0
+    return count
+
+def open_frame_pipe(stream_url):
+    ffmpeg_cmd = [
+        'ffmpeg',
+        '-hide_banner',
+        '-loglevel', 'error',
+        # Decode on VAAPI/QSV/CUDA when the host has it (falls back to software)
+        '-hwaccel', 'auto',
+        '-rtsp_transport', 'tcp',
+        # Give up on a stalled camera after 5s of silence; ffmpeg exits, the
+        # pipe hits EOF and the short read below is treated as a lost signal
+        '-timeout', '5000000',
+        '-i', stream_url,
+        '-an',
+        # fps first so dropped frames are never scaled or converted
+        '-vf', f'fps={ANALYSIS_FPS},scale={IMGSZ}:{IMGSZ}',
+        '-pix_fmt', 'bgr24',
+        '-f', 'rawvideo',
+        'pipe:1'
+    ]
+    return subprocess.Popen(ffmpeg_cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, bufsize=FRAME_BYTES)
+
+def process_camera(camera, stop_event, model):
     cam_id = camera['id']
     cam_name = camera['name']
 
@@ -62,49 +137,67 @@ def process_camera(camera, stop_event):
     
     log.info(f"[{cam_name}] Watching for classes: {target_classes}")
 
+    # Motion outside the selected cells never counts, globally or inside a box
+    roi_map = build_roi_map(camera.get('motion_roi'))
+
     if camera.get('rtsp_substream_url') and len(camera['rtsp_substream_url']) > 5:
         stream_url = camera['rtsp_substream_url']
     else:
         stream_url = f"{RTSP_BASE}/{camera['path']}"
     
-    model = YOLO(MODEL_NAME, task='detect')
-    cap = cv2.VideoCapture(stream_url)
+    proc = open_frame_pipe(stream_url)
     
-    frame_count = 0
     is_recording = False
     cooldown = 0
-    prev_gray = None
+    has_prev = False
+    last_fingerprint = None
+    mask_buffer = np.empty((IMGSZ, IMGSZ), dtype=np.uint8)
+    # Every frame is read into the same buffer; small_frame is a view over it
+    frame_buffer = bytearray(FRAME_BYTES)
+    small_frame = np.frombuffer(frame_buffer, dtype=np.uint8).reshape(IMGSZ, IMGSZ, 3)
+    # Per-stage outputs are preallocated too; prev/cur blurred frames swap roles each tick
+    gray = np.empty((IMGSZ, IMGSZ), dtype=np.uint8)
+    fingerprint_buffer = np.empty((FINGERPRINT_SIZE[1], FINGERPRINT_SIZE[0]), dtype=np.uint8)
+    prev_gray = np.empty((IMGSZ, IMGSZ), dtype=np.uint8)
+    cur_gray = np.empty((IMGSZ, IMGSZ), dtype=np.uint8)
     
     while not stop_event.is_set():
-        frame_count += 1
-
-        if frame_count % FRAME_SKIP != 0:
-            cap.grab()
-            time.sleep(0.01)
+        if proc.stdout.readinto(frame_buffer) < FRAME_BYTES:
+            log.warning(f"[{cam_name}] Signal lost. Retrying in 10s...")
+            proc.kill()
+            proc.wait()
+            # A camera removed while we wait shouldn't get a fresh ffmpeg
+            if stop_event.wait(10):
+                return
+            proc = open_frame_pipe(stream_url)
+            has_prev = False
+            last_fingerprint = None
             continue
 
-        success, frame = cap.retrieve()
-        if not success:
-            log.warning(f"[{cam_name}] Signal lost. Retrying in 10s...")
-            time.sleep(10)
-            cap.open(stream_url)
-            prev_gray = None
+        # small_frame is already IMGSZ x IMGSZ BGR: fed to YOLO as-is, single-channel copy for motion
+        cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY, dst=gray)
+
+        # --- OPTIMIZATION: STATIC FRAME SHORT-CIRCUIT ---
+        # A frozen/static feed hashes identically; skip blur, diff and AI entirely.
+        fingerprint = zlib.crc32(cv2.resize(gray, FINGERPRINT_SIZE, dst=fingerprint_buffer, interpolation=cv2.INTER_AREA))
+        if fingerprint == last_fingerprint and not is_recording:
             continue
+        last_fingerprint = fingerprint
 
-        small_frame = cv2.resize(frame, (IMGSZ, IMGSZ))
-        gray = cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY)
-        gray = cv2.GaussianBlur(gray, (21, 21), 0)
+        # Box filter of matching spread to the old 21x21 Gaussian (sigma ~3.5): OpenCV
+        # computes it with running sums, so the cost doesn't grow with the window
+        cv2.blur(gray, (13, 13), dst=cur_gray)
         
         motion_mask = None
         global_motion_score = 0
 
-        if prev_gray is not None:
-            delta = cv2.absdiff(prev_gray, gray)
-            motion_mask = cv2.threshold(delta, 25, 255, cv2.THRESH_BINARY)[1]
-            # Calculate total motion on screen
-            global_motion_score = np.count_nonzero(motion_mask)
+        if has_prev:
+            # Calculate total motion on screen (same result as absdiff > threshold, count_nonzero)
+            global_motion_score = motion_step(prev_gray, cur_gray, roi_map, mask_buffer)
+            motion_mask = mask_buffer
         
-        prev_gray = gray
+        prev_gray, cur_gray = cur_gray, prev_gray
+        has_prev = True
 
         # --- OPTIMIZATION: GLOBAL GATING ---
         # If barely anything moved AND we aren't currently recording, 
@@ -114,35 +207,43 @@ def process_camera(camera, stop_event):
         # -----------------------------------
 
         # Run AI
-        results = model(small_frame, classes=target_classes, verbose=False, conf=CONFIDENCE, imgsz=IMGSZ)
+        with inference_lock:
+            results = model(small_frame, classes=target_classes, verbose=False, conf=CONFIDENCE, imgsz=IMGSZ)
         
         valid_detection_label = ""
         
         for result in results:
-            for box in result.boxes:
-                cls_id = int(box.cls[0])
-                if cls_id in target_classes:
-                    label = model.names[cls_id]
-                    
-                    # Object-Specific Motion Check
-                    if motion_mask is not None:
-                        x1, y1, x2, y2 = box.xyxy[0].int().tolist()
-                        h, w = motion_mask.shape
-                        x1, y1 = max(0, x1), max(0, y1)
-                        x2, y2 = min(w, x2), min(h, y2)
-                        
-                        obj_motion = motion_mask[y1:y2, x1:x2]
-                        moving_pixels = cv2.countNonZero(obj_motion)
-                        
-                        if moving_pixels > OBJECT_MOTION_THRESHOLD:
-                            valid_detection_label = label
-                            break 
-                    else:
-                        # First frame of connection, assume valid to be safe
-                        valid_detection_label = label
-                        break
-
-            if valid_detection_label: break
+            boxes = result.boxes
+            if len(boxes) == 0:
+                continue
+            # Pull every box out of the tensors in one go instead of per-box .tolist() calls
+            cls_ids = boxes.cls.cpu().numpy().astype(np.int64)
+            keep = np.isin(cls_ids, target_classes)
+            if not keep.any():
+                continue
+            cls_ids = cls_ids[keep]
+
+            if motion_mask is None:
+                # First frame of connection, assume valid to be safe
+                valid_detection_label = model.names[int(cls_ids[0])]
+                break
+
+            # Object-Specific Motion Check
+            h, w = motion_mask.shape
+            xyxy = boxes.xyxy.cpu().numpy().astype(np.int64)[keep]
+            np.clip(xyxy[:, 0::2], 0, w, out=xyxy[:, 0::2])
+            np.clip(xyxy[:, 1::2], 0, h, out=xyxy[:, 1::2])
+            x1, y1, x2, y2 = xyxy.T
+            # Degenerate boxes become empty, like an empty slice would
+            x2 = np.maximum(x2, x1)
+            y2 = np.maximum(y2, y1)
+            # Summed-area table of the 0/255 mask: every box's moving-pixel count is four lookups
+            integral = cv2.integral(motion_mask)
+            moving_pixels = (integral[y2, x2] - integral[y1, x2] - integral[y2, x1] + integral[y1, x1]) // 255
+            hits = np.flatnonzero(moving_pixels > OBJECT_MOTION_THRESHOLD)
+            if hits.size:
+                valid_detection_label = model.names[int(cls_ids[hits[0]])]
+                break
 
         # Trigger Logic
         if valid_detection_label:
@@ -164,7 +265,8 @@ def process_camera(camera, stop_event):
                     except: pass
                     is_recording = False
 
-    cap.release()
+    proc.kill()
+    proc.wait()
 
 def main():
     global MODEL_NAME
@@ -179,6 +281,8 @@ def main():
     except Exception:
         MODEL_NAME = PT_NAME
 
+    shared_model = YOLO(MODEL_NAME, task='detect')
+
     watchers = {}
     while True:
         cameras = get_cameras()
@@ -190,7 +294,7 @@ def main():
                 active_ids.add(cid)
                 if cid not in watchers:
                     stop_event = threading.Event()
-                    t = threading.Thread(target=process_camera, args=(cam, stop_event))
+                    t = threading.Thread(target=process_camera, args=(cam, stop_event, shared_model))
                     t.daemon = True
                     t.start()
                     watchers[cid] = stop_event
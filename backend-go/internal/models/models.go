@@ -49,7 +49,7 @@ type Event struct {
 
 type UserSession struct {
 	ID        uint      `gorm:"primaryKey" json:"id"`
-	JTI       string    `gorm:"uniqueIndex" json:"jti"`
+	JTI       string    `gorm:"type:uuid;uniqueIndex" json:"jti"`
 	UserID    uint      `json:"user_id"`
 	UserAgent string    `json:"user_agent"`
 	IPAddress string    `json:"ip_address"`
@@ -0,0 +1,28 @@
+"""Index user_sessions.user_id and make jti non-nullable
+
+Revision ID: 3f1a9c2d7b10
+Revises: 72c78fa47718
+Create Date: 2026-10-15 09:12:04.118230
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1a9c2d7b10'
+down_revision: Union[str, None] = '72c78fa47718'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column('user_sessions', 'jti', existing_type=sa.String(), nullable=False)
+    op.create_index(op.f('ix_user_sessions_user_id'), 'user_sessions', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_user_sessions_user_id'), table_name='user_sessions')
+    op.alter_column('user_sessions', 'jti', existing_type=sa.String(), nullable=True)
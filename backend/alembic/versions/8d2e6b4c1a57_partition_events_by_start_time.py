@@ -0,0 +1,103 @@
+"""Partition events by month on start_time
+
+Revision ID: 8d2e6b4c1a57
+Revises: 3f1a9c2d7b10
+Create Date: 2026-10-15 10:02:47.530112
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e6b4c1a57'
+down_revision: Union[str, None] = '3f1a9c2d7b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Build the partitioned table next to the old one, copy rows over, then swap names.
+    op.execute("""
+        CREATE TABLE events_new (
+            id SERIAL NOT NULL,
+            start_time TIMESTAMP WITH TIME ZONE NOT NULL,
+            end_time TIMESTAMP WITH TIME ZONE,
+            reason VARCHAR,
+            video_path VARCHAR,
+            thumbnail_path VARCHAR,
+            camera_id INTEGER REFERENCES cameras (id),
+            user_id INTEGER REFERENCES users (id),
+            CONSTRAINT events_new_pkey PRIMARY KEY (id, start_time),
+            CONSTRAINT events_new_video_path_start_time_key UNIQUE (video_path, start_time)
+        ) PARTITION BY RANGE (start_time)
+    """)
+    op.execute("CREATE TABLE events_default PARTITION OF events_new DEFAULT")
+
+    # One partition per month that already has rows, through next month (UTC bounds)
+    op.execute("""
+        DO $$
+        DECLARE
+            m TIMESTAMP;
+            last_month TIMESTAMP := date_trunc('month', now() AT TIME ZONE 'UTC') + INTERVAL '1 month';
+        BEGIN
+            SELECT date_trunc('month', COALESCE(MIN(start_time), now()) AT TIME ZONE 'UTC') INTO m FROM events;
+            WHILE m <= last_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF events_new FOR VALUES FROM (%L) TO (%L)',
+                    'events_' || to_char(m, 'YYYY_MM'),
+                    m AT TIME ZONE 'UTC',
+                    (m + INTERVAL '1 month') AT TIME ZONE 'UTC'
+                );
+                m := m + INTERVAL '1 month';
+            END LOOP;
+        END $$
+    """)
+
+    op.execute("""
+        INSERT INTO events_new (id, start_time, end_time, reason, video_path, thumbnail_path, camera_id, user_id)
+        SELECT id, COALESCE(start_time, now()), end_time, reason, video_path, thumbnail_path, camera_id, user_id
+        FROM events
+    """)
+    op.execute("SELECT setval(pg_get_serial_sequence('events_new', 'id'), COALESCE(MAX(id), 0) + 1, false) FROM events_new")
+
+    op.drop_table('events')
+    op.rename_table('events_new', 'events')
+    op.execute("ALTER SEQUENCE events_new_id_seq RENAME TO events_id_seq")
+    op.execute("ALTER TABLE events RENAME CONSTRAINT events_new_pkey TO events_pkey")
+    op.execute("ALTER TABLE events RENAME CONSTRAINT events_new_video_path_start_time_key TO events_video_path_start_time_key")
+
+    op.create_index(op.f('ix_events_id'), 'events', ['id'], unique=False)
+    op.create_index(op.f('ix_events_start_time'), 'events', ['start_time'], unique=False)
+    op.create_index(op.f('ix_events_reason'), 'events', ['reason'], unique=False)
+
+
+def downgrade() -> None:
+    op.create_table(
+        'events_old',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('start_time', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('end_time', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('reason', sa.String(), nullable=True),
+        sa.Column('video_path', sa.String(), nullable=True),
+        sa.Column('thumbnail_path', sa.String(), nullable=True),
+        sa.Column('camera_id', sa.Integer(), sa.ForeignKey('cameras.id'), nullable=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+        sa.PrimaryKeyConstraint('id', name='events_old_pkey'),
+        sa.UniqueConstraint('video_path', name='events_old_video_path_key'),
+    )
+    op.execute("INSERT INTO events_old SELECT id, start_time, end_time, reason, video_path, thumbnail_path, camera_id, user_id FROM events")
+
+    # Dropping the partitioned parent drops every partition with it
+    op.execute("ALTER SEQUENCE events_id_seq OWNED BY events_old.id")
+    op.execute("ALTER TABLE events_old ALTER COLUMN id SET DEFAULT nextval('events_id_seq')")
+    op.drop_table('events')
+    op.rename_table('events_old', 'events')
+    op.execute("ALTER TABLE events RENAME CONSTRAINT events_old_pkey TO events_pkey")
+    op.execute("ALTER TABLE events RENAME CONSTRAINT events_old_video_path_key TO events_video_path_key")
+
+    op.create_index(op.f('ix_events_id'), 'events', ['id'], unique=False)
+    op.create_index(op.f('ix_events_start_time'), 'events', ['start_time'], unique=False)
+    op.create_index(op.f('ix_events_reason'), 'events', ['reason'], unique=False)
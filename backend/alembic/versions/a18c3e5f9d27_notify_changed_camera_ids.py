@@ -0,0 +1,44 @@
+"""Notify the id of each changed camera row
+
+Revision ID: a18c3e5f9d27
+Revises: f6a2d8e41b95
+Create Date: 2026-10-15 13:04:52.611093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a18c3e5f9d27'
+down_revision: Union[str, None] = 'f6a2d8e41b95'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE OR REPLACE FUNCTION notify_cameras_changed() RETURNS trigger AS $$ "
+        "BEGIN PERFORM pg_notify('cameras_changed', COALESCE(NEW.id, OLD.id)::text); RETURN NULL; END; "
+        "$$ LANGUAGE plpgsql"
+    )
+    op.execute("DROP TRIGGER IF EXISTS cameras_changed ON cameras")
+    op.execute(
+        "CREATE TRIGGER cameras_changed AFTER INSERT OR UPDATE OR DELETE ON cameras "
+        "FOR EACH ROW EXECUTE FUNCTION notify_cameras_changed()"
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        "CREATE OR REPLACE FUNCTION notify_cameras_changed() RETURNS trigger AS $$ "
+        "BEGIN PERFORM pg_notify('cameras_changed', TG_OP); RETURN NULL; END; "
+        "$$ LANGUAGE plpgsql"
+    )
+    op.execute("DROP TRIGGER IF EXISTS cameras_changed ON cameras")
+    op.execute(
+        "CREATE TRIGGER cameras_changed AFTER INSERT OR UPDATE OR DELETE ON cameras "
+        "FOR EACH STATEMENT EXECUTE FUNCTION notify_cameras_changed()"
+    )
@@ -0,0 +1,37 @@
+"""Maintain cameras.updated_at with a trigger
+
+Revision ID: b3e9f1c7a42d
+Revises: a18c3e5f9d27
+Create Date: 2026-10-15 15:41:07.203518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3e9f1c7a42d'
+down_revision: Union[str, None] = 'a18c3e5f9d27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("UPDATE cameras SET updated_at = now() WHERE updated_at IS NULL")
+    op.execute(
+        "CREATE OR REPLACE FUNCTION touch_cameras_updated_at() RETURNS trigger AS $$ "
+        "BEGIN NEW.updated_at := now(); RETURN NEW; END; "
+        "$$ LANGUAGE plpgsql"
+    )
+    op.execute("DROP TRIGGER IF EXISTS cameras_touch_updated_at ON cameras")
+    op.execute(
+        "CREATE TRIGGER cameras_touch_updated_at BEFORE UPDATE ON cameras "
+        "FOR EACH ROW EXECUTE FUNCTION touch_cameras_updated_at()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS cameras_touch_updated_at ON cameras")
+    op.execute("DROP FUNCTION IF EXISTS touch_cameras_updated_at()")
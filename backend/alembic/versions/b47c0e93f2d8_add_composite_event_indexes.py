@@ -0,0 +1,32 @@
+"""Add composite (user|camera, start_time DESC) indexes on events
+
+Revision ID: b47c0e93f2d8
+Revises: 8d2e6b4c1a57
+Create Date: 2026-10-15 10:41:19.204377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b47c0e93f2d8'
+down_revision: Union[str, None] = '8d2e6b4c1a57'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY isn't allowed on a partitioned parent; the per-partition
+    # builds are small since each partition only holds one month.
+    op.create_index('ix_events_user_time', 'events', ['user_id', sa.text('start_time DESC')], unique=False)
+    op.create_index('ix_events_camera_time', 'events', ['camera_id', sa.text('start_time DESC')], unique=False)
+    op.drop_index(op.f('ix_events_reason'), table_name='events')
+
+
+def downgrade() -> None:
+    op.create_index(op.f('ix_events_reason'), 'events', ['reason'], unique=False)
+    op.drop_index('ix_events_camera_time', table_name='events')
+    op.drop_index('ix_events_user_time', table_name='events')
@@ -0,0 +1,26 @@
+"""Add updated_at to cameras
+
+Revision ID: c5a81f7d3e26
+Revises: b47c0e93f2d8
+Create Date: 2026-10-15 11:05:33.871540
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5a81f7d3e26'
+down_revision: Union[str, None] = 'b47c0e93f2d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('cameras', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('cameras', 'updated_at')
@@ -0,0 +1,39 @@
+"""Store user_sessions.jti as a native uuid
+
+Revision ID: d92f4b6a0c13
+Revises: c5a81f7d3e26
+Create Date: 2026-10-15 11:28:52.640918
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd92f4b6a0c13'
+down_revision: Union[str, None] = 'c5a81f7d3e26'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        'user_sessions', 'jti',
+        existing_type=sa.String(),
+        type_=postgresql.UUID(as_uuid=False),
+        existing_nullable=False,
+        postgresql_using='jti::uuid'
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        'user_sessions', 'jti',
+        existing_type=postgresql.UUID(as_uuid=False),
+        type_=sa.String(),
+        existing_nullable=False,
+        postgresql_using='jti::text'
+    )
@@ -0,0 +1,33 @@
+"""Make ix_events_user_time a covering index for the event summary
+
+Revision ID: e3b7c9d15f42
+Revises: d92f4b6a0c13
+Create Date: 2026-10-15 11:49:10.385261
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e3b7c9d15f42'
+down_revision: Union[str, None] = 'd92f4b6a0c13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.drop_index('ix_events_user_time', table_name='events')
+    op.create_index(
+        'ix_events_user_time', 'events', ['user_id', sa.text('start_time DESC')],
+        unique=False, postgresql_include=['id', 'end_time', 'camera_id']
+    )
+    # Refresh planner stats; autovacuum maintains the visibility map index-only scans rely on
+    op.execute("ANALYZE events")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_events_user_time', table_name='events')
+    op.create_index('ix_events_user_time', 'events', ['user_id', sa.text('start_time DESC')], unique=False)
@@ -0,0 +1,35 @@
+"""Notify the motion detector when the cameras table changes
+
+Revision ID: f6a2d8e41b95
+Revises: e3b7c9d15f42
+Create Date: 2026-10-15 12:21:37.904512
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a2d8e41b95'
+down_revision: Union[str, None] = 'e3b7c9d15f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE OR REPLACE FUNCTION notify_cameras_changed() RETURNS trigger AS $$ "
+        "BEGIN PERFORM pg_notify('cameras_changed', TG_OP); RETURN NULL; END; "
+        "$$ LANGUAGE plpgsql"
+    )
+    op.execute(
+        "CREATE OR REPLACE TRIGGER cameras_changed AFTER INSERT OR UPDATE OR DELETE ON cameras "
+        "FOR EACH STATEMENT EXECUTE FUNCTION notify_cameras_changed()"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS cameras_changed ON cameras")
+    op.execute("DROP FUNCTION IF EXISTS notify_cameras_changed()")
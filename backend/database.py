@@ -1,5 +1,4 @@
 from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from pydantic_settings import BaseSettings
 
@@ -29,9 +28,6 @@ engine = create_engine(DATABASE_URL)
 # Each instance of SessionLocal will be a new database session
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Base class for our SQLAlchemy models
-Base = declarative_base()
-
 # Dependency to get a DB session in API routes
 def get_db():
     db = SessionLocal()
@@ -1,8 +1,8 @@
 from fastapi import FastAPI, Depends, HTTPException, status, BackgroundTasks, Request
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func
+from sqlalchemy.orm import Session, joinedload, raiseload
+from sqlalchemy import func, select, delete, update
 from typing import List, Optional
 import re
 import httpx
@@ -12,11 +12,12 @@ import hashlib
 import uuid
 import time
 import shutil
+import stat
 import psutil
 import docker 
 from datetime import datetime, timezone, timedelta, date 
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 import os
 import sys
 
@@ -32,12 +33,32 @@ from pydantic import BaseModel, Field, validator
 # --- Logging ---
 log = logging.getLogger("uvicorn")
 
+# Characters stripped from camera names when building mediamtx path names
+_SAFE_NAME_RE = re.compile(r'[^a-zA-Z0-9_-]')
+
 # --- Database Initialization ---
 models.Base.metadata.create_all(bind=engine)
+# Partitions are kept up by the migration and the motion detector; this only
+# covers a fresh database. It must never stop the API from starting: an events
+# table the partitioning migration hasn't reached yet is left alone, and a
+# failure (e.g. racing the detector's own maintenance) is just logged.
+try:
+    with engine.begin() as connection:
+        if models.events_is_partitioned(connection):
+            models.ensure_event_partitions(connection)
+        else:
+            log.warning("events is not partitioned yet (run `alembic upgrade head`); skipping partition setup")
+except Exception as e:
+    log.error(f"Could not create events partitions: {e}")
+with engine.begin() as connection:
+    models.ensure_camera_change_trigger(connection)
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 os.makedirs("/recordings", exist_ok=True)
+# Canonical location of /recordings (it may be a symlink or reached through one);
+# resolved download paths are compared against this, not the literal path
+RECORDINGS_ROOT = os.path.realpath("/recordings")
 app.mount("/recordings", StaticFiles(directory="/recordings"), name="recordings")
 
 
@@ -182,6 +203,7 @@ def get_secret_key():
 SECRET_KEY = get_secret_key()
 MEDIAMTX_ADMIN_PASS = "mysecretpassword"
 MEDIAMTX_VIEWER_PASS = "secret"
+MEDIAMTX_API_URL = "http://mediamtx:9997/v3/config/paths"
 
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 15
@@ -190,50 +212,76 @@ pwd_context = CryptContext(schemes=["argon2", "bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
 def verify_password(plain_password, hashed_password): return pwd_context.verify(plain_password, hashed_password)
 def get_password_hash(password): return pwd_context.hash(password)
+# Verified against on unknown emails so login timing doesn't reveal which accounts exist
+DUMMY_PASSWORD_HASH = get_password_hash("not-a-real-password")
 def create_access_token(data: dict, expires_delta: timedelta):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + expires_delta
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+async def decode_token(token: str) -> dict:
+    """Verifies a JWT in a worker thread so HMAC work doesn't block the event loop."""
+    return await asyncio.to_thread(jwt.decode, token, SECRET_KEY, algorithms=[ALGORITHM])
 
 
 # ====================================================================
 #                 Helper Functions
 # ====================================================================
 
+def create_mediamtx_client() -> httpx.AsyncClient:
+    """Client for the mediamtx path-config API. Requests use relative URLs."""
+    return httpx.AsyncClient(
+        base_url=MEDIAMTX_API_URL,
+        auth=("admin", MEDIAMTX_ADMIN_PASS),
+        limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+        timeout=httpx.Timeout(10.0, connect=2.0),
+    )
+
+def mediamtx_client() -> httpx.AsyncClient:
+    """Returns the shared keep-alive client created at startup."""
+    return app.state.mediamtx
+
 async def configure_mediamtx_path(camera_path: str, rtsp_url: str):
     """Adds or updates a camera path in mediamtx."""
-    auth = ("admin", MEDIAMTX_ADMIN_PASS) 
-    
     path_config = {
         "source": rtsp_url,
         "sourceOnDemand": True,
     }
 
-    async with httpx.AsyncClient() as client:
-        patch_url = f"http://mediamtx:9997/v3/config/paths/patch/{camera_path}"
-        try:
-            response = await client.patch(patch_url, auth=auth, json=path_config)
-            if response.status_code == 404:
-                log.warning(f"--- Path {camera_path} not found, creating... ---")
-                add_url = f"http://mediamtx:9997/v3/config/paths/add/{camera_path}"
-                add_response = await client.post(add_url, auth=auth, json=path_config)
-                add_response.raise_for_status()
-            else:
-                response.raise_for_status()
-        except httpx.HTTPStatusError as e:
-            log.error(f"--- mediamtx API error: {e.response.text} ---")
-            raise
-        except httpx.RequestError as e:
-            log.error(f"--- Cannot contact mediamtx: {e} ---")
-            raise
+    client = mediamtx_client()
+    try:
+        response = await client.patch(f"/patch/{camera_path}", json=path_config)
+        if response.status_code == 404:
+            log.warning(f"--- Path {camera_path} not found, creating... ---")
+            add_response = await client.post(f"/add/{camera_path}", json=path_config)
+            add_response.raise_for_status()
+        else:
+            response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        log.error(f"--- mediamtx API error: {e.response.text} ---")
+        raise
+    except httpx.RequestError as e:
+        log.error(f"--- Cannot contact mediamtx: {e} ---")
+        raise
 
 # ====================================================================
 #                     Startup Event
 # ====================================================================
+STARTUP_SYNC_CONCURRENCY = 16
+
+async def sync_mediamtx_path(camera: models.Camera, sem: asyncio.Semaphore):
+    """Re-registers one camera path in mediamtx, logging (not raising) failures."""
+    async with sem:
+        log.info(f"--- STARTUP: Updating camera {camera.path} ---")
+        try:
+            await configure_mediamtx_path(camera.path, camera.rtsp_url)
+        except Exception as e:
+            log.error(f"--- STARTUP: Failed to configure {camera.path}: {e} ---")
+
 @app.on_event("startup")
 async def on_startup():
+    app.state.mediamtx = create_mediamtx_client()
     log.info("--- STARTUP: Re-populating mediamtx ---")
     db = SessionLocal()
     try:
@@ -245,25 +293,62 @@ async def on_startup():
         for camera in all_cameras:
             if not camera.rtsp_url:
                 log.warning(f"--- STARTUP: Skipping camera {camera.path} (no URL) ---")
-                continue
-            log.info(f"--- STARTUP: Updating camera {camera.path} ---")
-            await configure_mediamtx_path(camera.path, camera.rtsp_url) 
-            
+
+        # Paths are independent, so fan out (bounded) instead of one RTT per camera
+        sem = asyncio.Semaphore(STARTUP_SYNC_CONCURRENCY)
+        await asyncio.gather(
+            *(sync_mediamtx_path(camera, sem) for camera in all_cameras if camera.rtsp_url),
+            return_exceptions=True
+        )
+
     except Exception as e:
         log.error(f"--- STARTUP: Failed to configure mediamtx: {e} ---")
     finally:
         db.close()
     log.info("--- STARTUP: mediamtx re-population complete. ---")
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    await app.state.mediamtx.aclose()
+
 
 # ====================================================================
 #                 DB Functions
 # ====================================================================
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).options(joinedload(models.User.cameras)).filter(models.User.email == email).first()
+
+# Every authenticated request resolves the user (and its camera list) from the token.
+# Keep the detached row for a short TTL so dashboard bursts skip the JOIN; any endpoint
+# that changes the user or their cameras must call invalidate_cached_user().
+# The cache is per-process: evict-on-write only revokes stale entries in the worker that
+# handled the write, so this guarantee holds only when uvicorn runs with a single worker.
+# Cached rows are shared between requests and must be treated as read-only.
+USER_CACHE_TTL = 60
+USER_CACHE_MAX_ENTRIES = 1024
+_user_cache: dict[str, tuple[float, models.User]] = {}
+def get_cached_user(db: Session, email: str):
+    now = time.monotonic()
+    entry = _user_cache.get(email)
+    if entry:
+        if now - entry[0] < USER_CACHE_TTL:
+            return entry[1]
+        _user_cache.pop(email, None)
+    user = get_user_by_email(db, email)
+    if user is not None:
+        # Detach (cameras cascade) so later commits in this session can't expire the cached copy
+        db.expunge(user)
+        if len(_user_cache) >= USER_CACHE_MAX_ENTRIES:
+            # Entries are inserted in time order, so the first key is the oldest
+            _user_cache.pop(next(iter(_user_cache), None), None)
+        _user_cache[email] = (now, user)
+    return user
+def invalidate_cached_user(email: str):
+    _user_cache.pop(email, None)
 def get_gravatar_hash(email: str) -> str:
     email_for_hash = email.strip().lower().encode('utf-8')
-    return hashlib.md5(email_for_hash).hexdigest()
+    # Only called when a user is created; the result is stored on User.gravatar_hash
+    return hashlib.md5(email_for_hash, usedforsecurity=False).hexdigest()
 def create_user_db(db: Session, user: UserCreate):
     hashed_password = get_password_hash(user.password)
     gravatar_hash = get_gravatar_hash(user.email) 
@@ -277,13 +362,14 @@ def create_user_db(db: Session, user: UserCreate):
     db.add(db_user)
     db.commit()
     return get_user_by_email(db, user.email)
-def get_cameras_by_user(db: Session, user_id: int):
-    return db.query(models.Camera).filter(models.Camera.owner_id == user_id).order_by(models.Camera.display_order).all()
 
 # ====================================================================
 #                 Auth Dependency
 # ====================================================================
-async def get_current_user_from_token(token: str | None = Depends(oauth2_scheme)) -> models.User:
+async def get_current_user_from_token(
+    token: str | None = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> models.User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -295,15 +381,15 @@ async def get_current_user_from_token(token: str | None = Depends(oauth2_scheme)
         headers={"WWW-Authenticate": "Bearer"},
     )
     if token is None: raise credentials_exception
-    db = SessionLocal()
+    # Same request-scoped session the endpoint gets from get_db, so one pool checkout per request
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = await decode_token(token)
         email: str = payload.get("sub")
         iat_timestamp: int = payload.get("iat") 
         if email is None or iat_timestamp is None:
             raise credentials_exception
         token_iat = datetime.fromtimestamp(iat_timestamp, tz=timezone.utc)
-        user = get_user_by_email(db, email=email)
+        user = get_cached_user(db, email=email)
         if user is None:
             raise credentials_exception
         if user.tokens_valid_from and token_iat < user.tokens_valid_from.replace(tzinfo=timezone.utc):
@@ -312,8 +398,6 @@ async def get_current_user_from_token(token: str | None = Depends(oauth2_scheme)
     except JWTError as e:
         credentials_exception.detail = f"Could not validate credentials: {e}"
         raise credentials_exception
-    finally:
-        db.close()
 
 # ====================================================================
 #                 API Endpoints
@@ -333,7 +417,9 @@ async def login_for_access_token(
     db = SessionLocal()
     try:
         user = get_user_by_email(db, email=form_data.username)
-        if not user or not verify_password(form_data.password, user.hashed_password):
+        hashed_password = user.hashed_password if user else DUMMY_PASSWORD_HASH
+        password_ok = await asyncio.to_thread(verify_password, form_data.password, hashed_password)
+        if not user or not password_ok:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Incorrect email or password", headers={"WWW-Authenticate": "Bearer"},)
         
         now_utc = datetime.now(timezone.utc)
@@ -370,7 +456,7 @@ async def refresh_access_token(request: Request):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Missing refresh token")
         
         refresh_token = auth_header.split(" ")[1]
-        payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = await decode_token(refresh_token)
         
         email: str = payload.get("sub")
         jti: str = payload.get("jti")
@@ -380,11 +466,13 @@ async def refresh_access_token(request: Request):
         if email is None or jti is None or token_type != "refresh" or iat_timestamp is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
         
-        session = db.query(models.UserSession).filter(models.UserSession.jti == jti).first()
-        if not session:
+        session_user_id = db.execute(
+            select(models.UserSession.user_id).where(models.UserSession.jti == jti)
+        ).scalar()
+        if session_user_id is None:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token not found (revoked)")
             
-        user = db.query(models.User).filter(models.User.id == session.user_id).first()
+        user = db.query(models.User).filter(models.User.id == session_user_id).first()
         if not user:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
 
@@ -416,14 +504,14 @@ async def read_user_cameras(current_user: models.User = Depends(get_current_user
 @app.post("/api/cameras", response_model=Camera, status_code=status.HTTP_201_CREATED)
 async def create_camera_for_user(
     camera: CameraCreate,
-    current_user: models.User = Depends(get_current_user_from_token)
+    current_user: models.User = Depends(get_current_user_from_token),
+    db: Session = Depends(get_db)
 ):
-    db = SessionLocal()
     try:
         user_id = current_user.id
         max_order = db.query(func.max(models.Camera.display_order)).filter(models.Camera.owner_id == user_id).scalar()
         new_order = (max_order or 0) + 1
-        safe_name = re.sub(r'[^a-zA-Z0-9_-]', '', camera.name.lower().replace(" ", "_"))
+        safe_name = _SAFE_NAME_RE.sub('', camera.name.lower().replace(" ", "_"))
         path_name = f"user_{user_id}_{safe_name}"
         existing = db.query(models.Camera).filter(models.Camera.path == path_name).first()
         if existing: 
@@ -445,20 +533,20 @@ async def create_camera_for_user(
         db.add(db_camera)
         db.commit()
         db.refresh(db_camera)
+        invalidate_cached_user(current_user.email)
         return db_camera
     except Exception as e:
         db.rollback()
         log.error(f"--- Error creating camera: {e} ---")
         raise HTTPException(status_code=500, detail="Failed to create camera in mediamtx")
-    finally: db.close()
 
 @app.patch("/api/cameras/{camera_id}", response_model=Camera)
 async def update_camera(
     camera_id: int, 
     camera_update: CameraUpdate, 
-    current_user: models.User = Depends(get_current_user_from_token)
+    current_user: models.User = Depends(get_current_user_from_token),
+    db: Session = Depends(get_db)
 ):
-    db = SessionLocal()
     try:
         db_camera = db.query(models.Camera).filter(models.Camera.id == camera_id, models.Camera.owner_id == current_user.id).first()
         if not db_camera: raise HTTPException(status_code=404, detail="Camera not found")
@@ -473,37 +561,33 @@ async def update_camera(
 
         db.commit()
         db.refresh(db_camera)
+        invalidate_cached_user(current_user.email)
         return db_camera
     except Exception as e:
         db.rollback()
         log.error(f"--- Error updating camera: {e} ---")
         raise HTTPException(status_code=500, detail="Failed to update camera")
-    finally:
-        db.close()
 
 @app.delete("/api/cameras/{camera_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_camera(
     camera_id: int, 
-    current_user: models.User = Depends(get_current_user_from_token)
+    current_user: models.User = Depends(get_current_user_from_token),
+    db: Session = Depends(get_db)
 ):
-    db = SessionLocal()
+    db_camera = db.query(models.Camera).filter(models.Camera.id == camera_id, models.Camera.owner_id == current_user.id).first()
+    if db_camera is None: raise HTTPException(status_code=404, detail="Camera not found or user does not own it")
+    
+    mediamtx_url = f"/delete/{db_camera.path}"
     try:
-        db_camera = db.query(models.Camera).filter(models.Camera.id == camera_id, models.Camera.owner_id == current_user.id).first()
-        if db_camera is None: raise HTTPException(status_code=404, detail="Camera not found or user does not own it")
-        
-        mediamtx_url = f"http://mediamtx:9997/v3/config/paths/delete/{db_camera.path}"
-        try:
-            auth = ("admin", MEDIAMTX_ADMIN_PASS)
-            async with httpx.AsyncClient() as client:
-                response = await client.delete(mediamtx_url, auth=auth)
-            if response.status_code != 404: response.raise_for_status()
-        except Exception as e: 
-            log.error(f"--- DELETING CAMERA: Failed to delete path {mediamtx_url}: {e} ---")
-        
-        db.delete(db_camera)
-        db.commit()
-        return
-    finally: db.close()
+        response = await mediamtx_client().delete(mediamtx_url)
+        if response.status_code != 404: response.raise_for_status()
+    except Exception as e: 
+        log.error(f"--- DELETING CAMERA: Failed to delete path {mediamtx_url}: {e} ---")
+    
+    db.delete(db_camera)
+    db.commit()
+    invalidate_cached_user(current_user.email)
+    return
 
 # --- WIPE CAMERA RECORDINGS ---
 @app.delete("/api/cameras/{camera_id}/recordings", status_code=status.HTTP_200_OK)
@@ -559,23 +643,26 @@ async def wipe_camera_recordings(
 @app.post("/api/cameras/reorder", status_code=status.HTTP_200_OK)
 async def reorder_cameras(
     req: ReorderRequest, 
-    current_user: models.User = Depends(get_current_user_from_token)
+    current_user: models.User = Depends(get_current_user_from_token),
+    db: Session = Depends(get_db)
 ):
-    db = SessionLocal()
     try:
-        user_cameras = {cam.id: cam for cam in current_user.cameras}
-        if len(req.camera_ids) != len(user_cameras): raise HTTPException(status_code=400, detail="Camera list mismatch")
-        for index, cam_id in enumerate(req.camera_ids):
-            if cam_id not in user_cameras: raise HTTPException(status_code=400, detail=f"Invalid camera ID: {cam_id}")
-            camera = user_cameras[cam_id]
-            camera.display_order = index
+        user_camera_ids = {cam.id for cam in current_user.cameras}
+        if len(req.camera_ids) != len(user_camera_ids): raise HTTPException(status_code=400, detail="Camera list mismatch")
+        for cam_id in req.camera_ids:
+            if cam_id not in user_camera_ids: raise HTTPException(status_code=400, detail=f"Invalid camera ID: {cam_id}")
+        # IDs are pre-filtered against the user's own cameras, so one executemany is safe
+        db.bulk_update_mappings(
+            models.Camera,
+            [{"id": cam_id, "display_order": index} for index, cam_id in enumerate(req.camera_ids)]
+        )
         db.commit()
+        invalidate_cached_user(current_user.email)
         return {"message": "Camera order updated successfully"}
     except Exception as e:
         db.rollback()
         log.error(f"--- Error reordering cameras: {e} ---")
         raise HTTPException(status_code=500, detail="Failed to reorder cameras")
-    finally: db.close()
 @app.post("/api/cameras/test-connection")
 async def test_camera_connection(
     req: TestCameraRequest, 
@@ -584,12 +671,9 @@ async def test_camera_connection(
 ):
     temp_path = f"test_{uuid.uuid4()}"
     log.info(f"--- Creating temp test path {temp_path} ---")
-    auth = ("admin", MEDIAMTX_ADMIN_PASS)
     try:
-        async with httpx.AsyncClient() as client:
-            add_url = f"http://mediamtx:9997/v3/config/paths/add/{temp_path}"
-            path_config = {"source": req.rtsp_url, "sourceOnDemand": True}
-            response = await client.post(add_url, auth=auth, json=path_config)
+        path_config = {"source": req.rtsp_url, "sourceOnDemand": True}
+        response = await mediamtx_client().post(f"/add/{temp_path}", json=path_config)
         response.raise_for_status()
         background_tasks.add_task(delete_temp_path, temp_path)
         return {"path": temp_path}
@@ -602,11 +686,8 @@ async def test_camera_connection(
 async def delete_temp_path(path: str):
     await asyncio.sleep(60) 
     log.info(f"--- CLEANUP: Deleting temp test path {path} ---")
-    auth = ("admin", MEDIAMTX_ADMIN_PASS)
-    mediamtx_url = f"http://mediamtx:9997/v3/config/paths/delete/{path}"
     try:
-        async with httpx.AsyncClient() as client:
-            await client.delete(mediamtx_url, auth=auth)
+        await mediamtx_client().delete(f"/delete/{path}")
     except Exception as e:
         log.error(f"--- Failed to delete temp path {path}: {e} ---")
 
@@ -675,7 +756,7 @@ async def get_events(
         query = query.filter(models.Event.start_time <= end_ts)
             
     events = (
-        query.options(joinedload(models.Event.camera))
+        query.options(joinedload(models.Event.camera), raiseload("*"))
         .order_by(models.Event.start_time.desc())
         .limit(100) 
         .all()
@@ -690,8 +771,9 @@ async def get_event_summary(
     current_user: models.User = Depends(get_current_user_from_token),
     db: Session = Depends(get_db)
 ):
+    # Only the summary columns, so ix_events_user_time can answer with an index-only scan
     query = (
-        db.query(models.Event)
+        db.query(models.Event.id, models.Event.start_time, models.Event.end_time, models.Event.camera_id)
         .filter(models.Event.user_id == current_user.id)
         .filter(models.Event.start_time >= start_ts)
         .filter(models.Event.start_time <= end_ts)
@@ -716,41 +798,39 @@ async def batch_delete_events(
     if not req.event_ids:
         return {"message": "No events to delete"}
 
-    # 1. Fetch events to get paths
-    events = db.query(models.Event).filter(
-        models.Event.id.in_(req.event_ids),
-        models.Event.user_id == current_user.id
-    ).all()
-
-    deleted_count = 0
-    
-    for event in events:
-        video_path = f"/{event.video_path}"
-        thumb_path = f"/{event.thumbnail_path}" if event.thumbnail_path else None
-        
-        try:
-            if os.path.exists(video_path):
-                os.remove(video_path)
-            if thumb_path and os.path.exists(thumb_path):
-                os.remove(thumb_path)
-            deleted_count += 1
-        except Exception as e:
-            log.error(f"Failed to delete file for event {event.id}: {e}")
-            
-    # 2. Delete from DB
+    # 1. Delete from DB, getting the file paths back from the same statement
     try:
-        db.query(models.Event).filter(
-            models.Event.id.in_(req.event_ids),
-            models.Event.user_id == current_user.id
-        ).delete(synchronize_session=False)
+        rows = db.execute(
+            delete(models.Event)
+            .where(models.Event.id.in_(req.event_ids), models.Event.user_id == current_user.id)
+            .returning(models.Event.id, models.Event.video_path, models.Event.thumbnail_path)
+        ).all()
         db.commit()
-        
-        return {"message": f"Successfully deleted {deleted_count} events."}
     except Exception as e:
         db.rollback()
         log.error(f"Batch delete DB error: {e}")
         raise HTTPException(status_code=500, detail="Database error during batch delete")
 
+    # 2. Remove the files of the rows that were actually deleted
+    deleted_count = 0
+    for event_id, video_db_path, thumb_db_path in rows:
+        video_path = f"/{video_db_path}"
+        thumb_path = f"/{thumb_db_path}" if thumb_db_path else None
+        
+        try:
+            for path in (video_path, thumb_path):
+                if not path:
+                    continue
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+            deleted_count += 1
+        except Exception as e:
+            log.error(f"Failed to delete file for event {event_id}: {e}")
+
+    return {"message": f"Successfully deleted {deleted_count} events."}
+
 
 @app.delete("/api/events/{event_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_event(
@@ -774,18 +854,18 @@ async def delete_event(
         db.commit()
         
         abs_video_path = f"/{video_path}" 
-        if os.path.exists(abs_video_path):
-            os.remove(abs_video_path)
+        try:
+            os.unlink(abs_video_path)
             log.info(f"--- Deleted video file: {abs_video_path} ---")
-        else:
+        except FileNotFoundError:
             log.warning(f"--- Video file not found: {abs_video_path} ---") 
             
         if thumb_path:
             abs_thumb_path = f"/{thumb_path}"
-            if os.path.exists(abs_thumb_path):
-                os.remove(abs_thumb_path)
+            try:
+                os.unlink(abs_thumb_path)
                 log.info(f"--- Deleted thumbnail file: {abs_thumb_path} ---")
-            else:
+            except FileNotFoundError:
                 log.warning(f"--- Thumbnail file not found: {abs_thumb_path} ---")
         return
     
@@ -907,15 +987,14 @@ async def delete_continuous_recording(
     # 3. Construct path and delete
     file_path = f"/recordings/continuous/{camera_id}/{filename}"
     
-    if os.path.exists(file_path):
-        try:
-            os.remove(file_path)
-            log.info(f"Deleted continuous recording: {file_path}")
-        except Exception as e:
-            log.error(f"Failed to delete file {file_path}: {e}")
-            raise HTTPException(status_code=500, detail="Failed to delete file")
-    else:
+    try:
+        os.unlink(file_path)
+        log.info(f"Deleted continuous recording: {file_path}")
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="File not found")
+    except Exception as e:
+        log.error(f"Failed to delete file {file_path}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to delete file")
     return
 
 # --- WIPE ALL RECORDINGS ENDPOINT ---
@@ -1070,89 +1149,104 @@ async def download_recording(
     Downloads a recording file.
     Expects 'path' to be relative to the /recordings directory.
     """
-    if ".." in path or path.startswith("/"):
+    clean_path = path.removeprefix("recordings/")
+
+    # Canonicalize first so "..", absolute paths and symlinks can't escape /recordings
+    try:
+        full_path = os.path.realpath(os.path.join(RECORDINGS_ROOT, clean_path))
+        inside_root = os.path.commonpath([full_path, RECORDINGS_ROOT]) == RECORDINGS_ROOT
+    except ValueError:
+        # e.g. an embedded NUL byte, which no real recording path contains
+        inside_root = False
+    if not inside_root:
         raise HTTPException(status_code=400, detail="Invalid path")
 
-    clean_path = path
-    if clean_path.startswith("recordings/"):
-        clean_path = clean_path.replace("recordings/", "", 1)
-        
-    full_path = os.path.join("/recordings", clean_path)
-    
-    if not os.path.exists(full_path):
-         raise HTTPException(status_code=404, detail="File not found")
+    try:
+        file_stat = os.stat(full_path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found")
+    if not stat.S_ISREG(file_stat.st_mode):
+        raise HTTPException(status_code=404, detail="File not found")
 
+    # Hand the stat result over so FileResponse doesn't stat the file again
     return FileResponse(
         path=full_path, 
         filename=os.path.basename(full_path), 
-        media_type='application/octet-stream'
+        media_type='application/octet-stream',
+        stat_result=file_stat
     )
 
 # --- User/Session Endpoints ---
 @app.put("/api/users/me", response_model=User)
 async def update_user_me(
     user_update: UserUpdate, 
-    current_user: models.User = Depends(get_current_user_from_token)
+    current_user: models.User = Depends(get_current_user_from_token),
+    db: Session = Depends(get_db)
 ):
-    db = SessionLocal()
-    try:
-        user = db.merge(current_user)
-        user.display_name = user_update.display_name
-        db.commit()
-        db.refresh(user)
-        return user
-    finally: db.close()
+    db.execute(
+        update(models.User)
+        .where(models.User.id == current_user.id)
+        .values(display_name=user_update.display_name)
+    )
+    db.commit()
+    invalidate_cached_user(current_user.email)
+    # Re-read rather than mutate current_user, which may be the shared cached row
+    return get_cached_user(db, current_user.email)
 @app.post("/api/users/change-password", status_code=status.HTTP_200_OK)
 async def change_password(
     passwords: PasswordChange, 
-    current_user: models.User = Depends(get_current_user_from_token)
+    current_user: models.User = Depends(get_current_user_from_token),
+    db: Session = Depends(get_db)
 ):
-    db = SessionLocal()
-    try:
-        user = db.merge(current_user)
-        if not verify_password(passwords.current_password, user.hashed_password):
-            raise HTTPException(status_code=400, detail="Incorrect current password")
-        new_hashed_password = get_password_hash(passwords.new_password)
-        user.hashed_password = new_hashed_password
-        user.tokens_valid_from = datetime.now(timezone.utc)
-        db.commit()
-        return {"message": "Password updated successfully"}
-    finally: db.close()
+    if not verify_password(passwords.current_password, current_user.hashed_password):
+        raise HTTPException(status_code=400, detail="Incorrect current password")
+    new_hashed_password = get_password_hash(passwords.new_password)
+    db.execute(
+        update(models.User)
+        .where(models.User.id == current_user.id)
+        .values(hashed_password=new_hashed_password, tokens_valid_from=datetime.now(timezone.utc))
+    )
+    db.commit()
+    invalidate_cached_user(current_user.email)
+    return {"message": "Password updated successfully"}
 @app.delete("/api/users/delete-account", status_code=status.HTTP_200_OK)
 async def delete_account(
-    current_user: models.User = Depends(get_current_user_from_token)
+    current_user: models.User = Depends(get_current_user_from_token),
+    db: Session = Depends(get_db)
 ):
-    db = SessionLocal()
-    try:
-        user = db.merge(current_user)
-        cameras = get_cameras_by_user(db, user_id=user.id)
-        auth = ("admin", MEDIAMTX_ADMIN_PASS)
-        async with httpx.AsyncClient() as client:
-            tasks = []
-            for camera in cameras:
-                mediamtx_url = f"http://mediamtx:9997/v3/config/paths/delete/{camera.path}"
-                log.info(f"--- Queuing delete for camera: {camera.path} ---")
-                tasks.append(client.delete(mediamtx_url, auth=auth))
-            if tasks:
-                await asyncio.gather(*tasks, return_exceptions=True)
-        
-        db.delete(user) 
-        db.commit()
-        return {"message": "Account and all associated cameras deleted successfully"}
-    finally: db.close()
+    # Already materialized by the joinedload in get_user_by_email
+    cameras = current_user.cameras
+    client = mediamtx_client()
+    tasks = []
+    for camera in cameras:
+        log.info(f"--- Queuing delete for camera: {camera.path} ---")
+        tasks.append(client.delete(f"/delete/{camera.path}"))
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+    
+    # Core DELETEs in FK order replace the ORM cascade (which SELECTs every child row)
+    user_id = current_user.id
+    db.execute(delete(models.Event).where(models.Event.user_id == user_id))
+    db.execute(delete(models.UserSession).where(models.UserSession.user_id == user_id))
+    db.execute(delete(models.Camera).where(models.Camera.owner_id == user_id))
+    db.execute(delete(models.User).where(models.User.id == user_id))
+    db.commit()
+    invalidate_cached_user(current_user.email)
+    return {"message": "Account and all associated cameras deleted successfully"}
 @app.post("/api/users/logout-all", status_code=status.HTTP_200_OK)
 async def logout_all_sessions(
-    current_user: models.User = Depends(get_current_user_from_token)
+    current_user: models.User = Depends(get_current_user_from_token),
+    db: Session = Depends(get_db)
 ):
-    db = SessionLocal()
-    try:
-        user = db.merge(current_user)
-        user.tokens_valid_from = datetime.now(timezone.utc)
-        db.query(models.UserSession).filter(models.UserSession.user_id == user.id).delete()
-        db.commit()
-        return {"message": "All other sessions have been logged out."}
-    finally:
-        db.close()
+    db.execute(
+        update(models.User)
+        .where(models.User.id == current_user.id)
+        .values(tokens_valid_from=datetime.now(timezone.utc))
+    )
+    db.execute(delete(models.UserSession).where(models.UserSession.user_id == current_user.id))
+    db.commit()
+    invalidate_cached_user(current_user.email)
+    return {"message": "All other sessions have been logged out."}
 @app.get("/api/webrtc-creds")
 async def get_webrtc_credentials(
     current_user: models.User = Depends(get_current_user_from_token)
@@ -1160,31 +1254,25 @@ async def get_webrtc_credentials(
     return {"user": "viewer", "pass": MEDIAMTX_VIEWER_PASS}
 @app.get("/api/sessions", response_model=List[UserSession])
 async def get_sessions(
-    current_user: models.User = Depends(get_current_user_from_token)
+    current_user: models.User = Depends(get_current_user_from_token),
+    db: Session = Depends(get_db)
 ):
-    db = SessionLocal()
-    try:
-        sessions = db.query(models.UserSession).filter(models.UserSession.user_id == current_user.id).all()
-        return sessions
-    finally:
-        db.close()
+    sessions = db.query(models.UserSession).filter(models.UserSession.user_id == current_user.id).all()
+    return sessions
 @app.delete("/api/sessions/{session_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def logout_session(
     session_id: int,
-    current_user: models.User = Depends(get_current_user_from_token)
+    current_user: models.User = Depends(get_current_user_from_token),
+    db: Session = Depends(get_db)
 ):
-    db = SessionLocal()
-    try:
-        session = db.query(models.UserSession).filter(
-            models.UserSession.id == session_id,
-            models.UserSession.user_id == current_user.id
-        ).first()
+    session = db.query(models.UserSession).filter(
+        models.UserSession.id == session_id,
+        models.UserSession.user_id == current_user.id
+    ).first()
+    
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
         
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-            
-        db.delete(session)
-        db.commit()
-        return
-    finally:
-        db.close()
\ No newline at end of file
+    db.delete(session)
+    db.commit()
+    return
\ No newline at end of file
@@ -0,0 +1,163 @@
+from sqlalchemy import Boolean, Column, ForeignKey, Integer, String, DateTime, Index, PrimaryKeyConstraint, UniqueConstraint, text
+from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy.dialects.postgresql import UUID
+import datetime 
+from datetime import timezone
+
+# Single source of truth for the schema, imported by both the backend and the motion detector
+Base = declarative_base()
+
+def get_utc_now():
+    return datetime.datetime.now(timezone.utc)
+
+def add_months(month_start: datetime.datetime, months: int) -> datetime.datetime:
+    month_index = month_start.month - 1 + months
+    return month_start.replace(year=month_start.year + month_index // 12, month=month_index % 12 + 1)
+
+def events_is_partitioned(connection) -> bool:
+    """False while `events` is still the plain table the partitioning migration replaces."""
+    return connection.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass('events'))"
+    )).scalar()
+
+def ensure_event_partitions(connection, months_ahead: int = 1):
+    """Creates the monthly `events` partitions for this month and the next `months_ahead`."""
+    # Catch-all so an insert outside the pre-created months never fails outright
+    connection.execute(text("CREATE TABLE IF NOT EXISTS events_default PARTITION OF events DEFAULT"))
+    month_start = get_utc_now().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    for i in range(months_ahead + 1):
+        lower = add_months(month_start, i)
+        upper = add_months(month_start, i + 1)
+        name = f"events_{lower:%Y_%m}"
+        bounds = f"FOR VALUES FROM ('{lower.isoformat()}') TO ('{upper.isoformat()}')"
+        if connection.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar() is not None:
+            continue
+        stranded = connection.execute(text(
+            "SELECT EXISTS (SELECT 1 FROM events_default WHERE start_time >= :lower AND start_time < :upper)"
+        ), {"lower": lower, "upper": upper}).scalar()
+        if not stranded:
+            connection.execute(text(f"CREATE TABLE {name} PARTITION OF events {bounds}"))
+            continue
+        # Rows that reached the catch-all before this month had a partition would
+        # make CREATE ... PARTITION OF fail for good: move them into a standalone
+        # table and attach that instead (indexes and keys are added on attach)
+        connection.execute(text(f"CREATE TABLE {name} (LIKE events INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+        connection.execute(text(
+            f"WITH moved AS (DELETE FROM events_default WHERE start_time >= :lower AND start_time < :upper RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ), {"lower": lower, "upper": upper})
+        connection.execute(text(f"ALTER TABLE events ATTACH PARTITION {name} {bounds}"))
+
+# Channel the cameras trigger notifies; the motion detector LISTENs on it
+CAMERA_CHANGES_CHANNEL = "cameras_changed"
+
+def ensure_camera_change_trigger(connection):
+    """
+    Installs the `cameras` change triggers: one keeps updated_at current on every
+    UPDATE, the other NOTIFYs the id of every written row.
+    """
+    # In the database rather than ORM onupdate, so writes from the Go API (whose
+    # Camera model has no UpdatedAt) bump it too
+    connection.execute(text(
+        "CREATE OR REPLACE FUNCTION touch_cameras_updated_at() RETURNS trigger AS $$ "
+        "BEGIN NEW.updated_at := now(); RETURN NEW; END; "
+        "$$ LANGUAGE plpgsql"
+    ))
+    connection.execute(text(
+        "CREATE OR REPLACE TRIGGER cameras_touch_updated_at BEFORE UPDATE ON cameras "
+        "FOR EACH ROW EXECUTE FUNCTION touch_cameras_updated_at()"
+    ))
+    connection.execute(text(
+        "CREATE OR REPLACE FUNCTION notify_cameras_changed() RETURNS trigger AS $$ "
+        f"BEGIN PERFORM pg_notify('{CAMERA_CHANGES_CHANNEL}', COALESCE(NEW.id, OLD.id)::text); RETURN NULL; END; "
+        "$$ LANGUAGE plpgsql"
+    ))
+    connection.execute(text(
+        "CREATE OR REPLACE TRIGGER cameras_changed AFTER INSERT OR UPDATE OR DELETE ON cameras "
+        "FOR EACH ROW EXECUTE FUNCTION notify_cameras_changed()"
+    ))
+
+class User(Base):
+    __tablename__ = "users"
+
+    id = Column(Integer, primary_key=True, index=True)
+    email = Column(String, unique=True, index=True)
+    hashed_password = Column(String)
+    display_name = Column(String, index=True, nullable=True)
+    gravatar_hash = Column(String, nullable=True)
+    
+    tokens_valid_from = Column(DateTime(timezone=True), default=get_utc_now)
+
+    cameras = relationship("Camera", back_populates="owner", cascade="all, delete-orphan", order_by="Camera.display_order")
+    sessions = relationship("UserSession", back_populates="user", cascade="all, delete-orphan")
+    events = relationship("Event", back_populates="owner", cascade="all, delete-orphan")
+
+class Camera(Base):
+    __tablename__ = "cameras"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, index=True)
+    path = Column(String, unique=True)
+    rtsp_url = Column(String)
+    rtsp_substream_url = Column(String, nullable=True)
+    owner_id = Column(Integer, ForeignKey("users.id"))
+    display_order = Column(Integer, default=0)
+    motion_type = Column(String, default="off", nullable=False)
+    motion_roi = Column(String, nullable=True)
+    motion_sensitivity = Column(Integer, default=50)
+    continuous_recording = Column(Boolean, default=False, nullable=False)
+    # Bumped on every update (by the cameras_touch_updated_at trigger, whoever writes)
+    # so the detector can cheaply tell if its cached list is stale
+    updated_at = Column(DateTime(timezone=True), default=get_utc_now, onupdate=get_utc_now)
+    
+    owner = relationship("User", back_populates="cameras")
+    events = relationship("Event", back_populates="camera", cascade="all, delete-orphan")
+
+class UserSession(Base):
+    __tablename__ = "user_sessions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    # Native uuid (16 bytes) keeps the per-refresh jti index small; values stay str in Python
+    jti = Column(UUID(as_uuid=False), unique=True, index=True, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), index=True)
+    user_agent = Column(String, nullable=True)
+    ip_address = Column(String, nullable=True)
+    
+    created_at = Column(DateTime(timezone=True), default=get_utc_now)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    
+    user = relationship("User", back_populates="sessions")
+
+class Event(Base):
+    __tablename__ = "events"
+
+    id = Column(Integer, autoincrement=True, index=True)
+    
+    start_time = Column(DateTime(timezone=True), default=get_utc_now, nullable=False, index=True)
+    end_time = Column(DateTime(timezone=True), nullable=True)
+    reason = Column(String, default="motion")
+    video_path = Column(String)
+    thumbnail_path = Column(String, nullable=True) 
+    camera_id = Column(Integer, ForeignKey("cameras.id"))
+    user_id = Column(Integer, ForeignKey("users.id"))
+
+    camera = relationship("Camera", back_populates="events")
+    owner = relationship("User", back_populates="events")
+
+    # RANGE-partitioned by month on start_time, so the partition key must be part of
+    # every unique constraint. Retention drops whole partitions instead of DELETEing rows.
+    # The composite indexes match the event list filters (user or camera, newest first);
+    # the user index also INCLUDEs the summary columns so timeline queries skip the heap.
+    __table_args__ = (
+        PrimaryKeyConstraint("id", "start_time"),
+        UniqueConstraint("video_path", "start_time"),
+        Index("ix_events_user_time", "user_id", start_time.desc(), postgresql_include=["id", "end_time", "camera_id"]),
+        Index("ix_events_camera_time", "camera_id", start_time.desc()),
+        {"postgresql_partition_by": "RANGE (start_time)"},
+    )
+
+# --- NEW TABLE ---
+class SystemSettings(Base):
+    __tablename__ = "system_settings"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    retention_days = Column(Integer, default=30) # Default to 30 days
\ No newline at end of file